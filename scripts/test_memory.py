@@ -7,8 +7,10 @@ from src.core.memory_system import LongTermMemory
 print("Testing Memory System...")
 
 memory = LongTermMemory(db_path="data/test.db")
-memory.add_memory("user", "Hello, robot!", "test_agent", "session1")
-memory.add_memory("assistant", "Hi! How can I help?", "test_agent", "session1")
+memory.add_memories([
+    ("user", "Hello, robot!", "test_agent", "session1"),
+    ("assistant", "Hi! How can I help?", "test_agent", "session1"),
+])
 
 memories = memory.get_recent_memories("test_agent", "session1")
 print(f"✓ Stored {len(memories)} memories")
@@ -4,12 +4,108 @@ Addresses issues #856 and #880 - Adds persistent conversational memory
 """
 
 import json
+import logging
+import re
 import sqlite3
+import threading
+import uuid
+import weakref
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
-import hashlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson turns integers wider than 64 bits into floats; 19+ digit runs go to json
+_LONG_NUMBER = re.compile(r"\d{19}")
+
+
+def _dump_metadata(metadata: Dict) -> str:
+    """Serialize metadata; json.dumps keeps NaN and rejects non-JSON types"""
+    return json.dumps(metadata)
+
+
+def _load_metadata(raw: str) -> Dict:
+    """Deserialize metadata, preferring orjson when the result is identical"""
+    if orjson is not None and not _LONG_NUMBER.search(raw):
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # Rows written by json.dumps may hold NaN/Infinity, which orjson rejects
+            pass
+    return json.loads(raw)
+
+
+# Statements are kept as constants so the connection's statement cache can reuse them
+SQL_INSERT = """
+    INSERT OR REPLACE INTO memories 
+    (id, timestamp, role, content, agent_id, session_id, metadata, importance_score)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQL_RECENT_BY_SESSION = """
+    SELECT id, timestamp, role, content, agent_id, session_id, metadata
+    FROM memories
+    WHERE agent_id = ? AND session_id = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+"""
+
+SQL_RECENT_BY_AGENT = """
+    SELECT id, timestamp, role, content, agent_id, session_id, metadata
+    FROM memories
+    WHERE agent_id = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+"""
+
+# Current-session and all-session history in one round-trip; is_past tags the source
+SQL_CONTEXT_WINDOW = """
+    SELECT is_past, role, content, session_id FROM (
+        SELECT 0 AS is_past, role, content, session_id, timestamp FROM (
+            SELECT role, content, session_id, timestamp
+            FROM memories
+            WHERE agent_id = ? AND session_id = ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        )
+        UNION ALL
+        SELECT 1 AS is_past, role, content, session_id, timestamp FROM (
+            SELECT role, content, session_id, timestamp
+            FROM memories
+            WHERE agent_id = ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        )
+    )
+    ORDER BY is_past, timestamp
+"""
+
+SQL_STATS = """
+    SELECT 
+        COUNT(*) as total_memories,
+        COUNT(DISTINCT session_id) as total_sessions,
+        MIN(timestamp) as first_memory,
+        MAX(timestamp) as last_memory
+    FROM memories
+    WHERE agent_id = ?
+"""
+
+
+def _close_connection(conn: sqlite3.Connection, pending: List[Tuple]):
+    """Write any rows still buffered and close the connection"""
+    if pending:
+        with conn:
+            conn.executemany(SQL_INSERT, pending)
+        pending.clear()
+    # Refresh planner statistics for the indexes before going away
+    conn.execute("PRAGMA optimize")
+    conn.close()
 
 
 @dataclass
@@ -31,17 +127,44 @@ class LongTermMemory:
     Stores conversations, retrieves relevant context, and manages memory lifecycle.
     """
     
-    def __init__(self, db_path: str = "data/memory.db", max_context_entries: int = 10):
+    def __init__(
+        self,
+        db_path: str = "data/memory.db",
+        max_context_entries: int = 10,
+        batch_size: int = 1
+    ):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self.max_context_entries = max_context_entries
+        # Rows are buffered until this many are pending, then written in one transaction
+        self.batch_size = batch_size
+        self._pending: List[Tuple] = []
+        self._pending_lock = threading.Lock()
+        
+        # One connection is shared by every call; the lock serializes access to it
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=256
+        )
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA cache_size=-20000")
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._closed = False
         self._init_db()
+        # Runs on close(), garbage collection or interpreter exit, whichever comes first.
+        # It only references the connection and buffer, so it never keeps self alive.
+        self._finalizer = weakref.finalize(
+            self, _close_connection, self._conn, self._pending
+        )
     
     def _init_db(self):
         """Initialize the SQLite database with proper schema"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
         
+        # WAL is persistent, so this only needs to run once per database file
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         # Main memories table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS memories (
@@ -57,10 +180,17 @@ class LongTermMemory:
             )
         """)
         
-        # Index for faster queries
+        # Indexes ordered to serve the "ORDER BY timestamp DESC LIMIT n" reads directly
+        cursor.execute("DROP INDEX IF EXISTS idx_agent_session")
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_agent_session_ts 
+            ON memories(agent_id, session_id, timestamp DESC)
+        """)
+        
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_agent_session 
-            ON memories(agent_id, session_id, timestamp)
+            CREATE INDEX IF NOT EXISTS idx_agent_ts 
+            ON memories(agent_id, timestamp DESC)
         """)
         
         cursor.execute("""
@@ -69,7 +199,6 @@ class LongTermMemory:
         """)
         
         conn.commit()
-        conn.close()
     
     def add_memory(
         self, 
@@ -81,32 +210,131 @@ class LongTermMemory:
         importance_score: float = 0.5
     ) -> str:
         """Add a new memory entry"""
-        memory_id = self._generate_id(content, session_id)
+        memory_id = self._generate_id()
         timestamp = datetime.utcnow().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO memories 
-            (id, timestamp, role, content, agent_id, session_id, metadata, importance_score)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            memory_id,
-            timestamp,
-            role,
-            content,
-            agent_id,
-            session_id,
-            json.dumps(metadata) if metadata else None,
-            importance_score
-        ))
+        with self._pending_lock:
+            self._check_open()
+            self._pending.append((
+                memory_id,
+                timestamp,
+                role,
+                content,
+                agent_id,
+                session_id,
+                _dump_metadata(metadata) if metadata else None,
+                importance_score
+            ))
+            should_flush = len(self._pending) >= self.batch_size
         
-        conn.commit()
-        conn.close()
+        if should_flush:
+            self.flush()
         
         return memory_id
     
+    def add_memories(
+        self,
+        entries: List[Tuple[str, str, str, str]]
+    ) -> List[str]:
+        """Add several (role, content, agent_id, session_id) entries in one transaction"""
+        rows = []
+        for role, content, agent_id, session_id in entries:
+            rows.append((
+                self._generate_id(),
+                datetime.utcnow().isoformat(),
+                role,
+                content,
+                agent_id,
+                session_id,
+                None,
+                0.5
+            ))
+        
+        with self._pending_lock:
+            self._check_open()
+            self._pending.extend(rows)
+        self.flush()
+        
+        return [row[0] for row in rows]
+    
+    def flush(self):
+        """Write all buffered memories to the database in a single transaction"""
+        rejected = self._flush()
+        if rejected is not None:
+            raise rejected
+    
+    def _flush(self) -> Optional[Exception]:
+        """
+        Write buffered memories, returning the first error for any dropped row.
+        
+        Rows leave the buffer only once they are committed or known to be unstorable.
+        An OperationalError such as "database is locked" keeps every row buffered
+        for the next flush and is raised directly. Reads call this instead of flush()
+        so that a dropped row, already logged, does not fail an unrelated read.
+        """
+        # Holding the connection lock across copy and write means a reader never
+        # sees an empty buffer while its rows are still uncommitted
+        with self._lock:
+            self._check_open()
+            with self._pending_lock:
+                rows = list(self._pending)
+            
+            if not rows:
+                return None
+            
+            rejected = None
+            try:
+                with self._conn:
+                    self._conn.executemany(SQL_INSERT, rows)
+            except sqlite3.OperationalError:
+                raise
+            except Exception:
+                # One bad row fails the whole batch; store the rest one by one
+                rejected = self._insert_rows_individually(rows)
+            
+            with self._pending_lock:
+                # Removed in place: the finalizer holds a reference to this list, and
+                # rows appended while we were writing stay queued behind these
+                del self._pending[:len(rows)]
+        
+        return rejected
+    
+    def _insert_rows_individually(self, rows: List[Tuple]) -> Optional[Exception]:
+        """Insert rows one at a time, dropping and logging the ones that fail"""
+        rejected = None
+        with self._conn:
+            for row in rows:
+                try:
+                    self._conn.execute(SQL_INSERT, row)
+                except sqlite3.OperationalError:
+                    raise
+                except Exception as e:
+                    logging.error(f"Dropping memory {row[0]} that could not be stored: {e}")
+                    if rejected is None:
+                        rejected = e
+        return rejected
+    
+    def close(self):
+        """Flush buffered memories and close the database connection"""
+        with self._lock:
+            # Taken so no row can be buffered between this check and the final write
+            with self._pending_lock:
+                if self._closed:
+                    return
+                self._closed = True
+            self._finalizer()
+    
+    def _check_open(self):
+        """Raise if close() has already been called"""
+        if self._closed:
+            raise RuntimeError(f"LongTermMemory for {self.db_path} is closed")
+    
+    def __enter__(self) -> "LongTermMemory":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def get_recent_memories(
         self, 
         agent_id: str, 
@@ -117,34 +345,20 @@ class LongTermMemory:
         if limit is None:
             limit = self.max_context_entries
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if session_id:
-            query = """
-                SELECT id, timestamp, role, content, agent_id, session_id, metadata
-                FROM memories
-                WHERE agent_id = ? AND session_id = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            """
-            cursor.execute(query, (agent_id, session_id, limit))
-        else:
-            query = """
-                SELECT id, timestamp, role, content, agent_id, session_id, metadata
-                FROM memories
-                WHERE agent_id = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            """
-            cursor.execute(query, (agent_id, limit))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        self._flush()
+        with self._lock:
+            if session_id:
+                rows = self._conn.execute(
+                    SQL_RECENT_BY_SESSION, (agent_id, session_id, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    SQL_RECENT_BY_AGENT, (agent_id, limit)
+                ).fetchall()
         
         memories = []
         for row in rows:
-            metadata = json.loads(row[6]) if row[6] else None
+            metadata = _load_metadata(row[6]) if row[6] else None
             memories.append(MemoryEntry(
                 id=row[0],
                 timestamp=row[1],
@@ -164,44 +378,41 @@ class LongTermMemory:
         include_past_sessions: bool = True
     ) -> str:
         """Generate a formatted context window for the LLM"""
-        current_memories = self.get_recent_memories(agent_id, session_id, limit=5)
+        past_limit = 5 if include_past_sessions else 0
+        
+        self._flush()
+        with self._lock:
+            rows = self._conn.execute(
+                SQL_CONTEXT_WINDOW,
+                (agent_id, session_id, 5, agent_id, past_limit)
+            ).fetchall()
         
         context_parts = ["=== Current Conversation ==="]
-        for mem in current_memories:
-            context_parts.append(f"{mem.role.upper()}: {mem.content}")
+        past_rows = []
+        for is_past, role, content, row_session_id in rows:
+            if is_past:
+                past_rows.append((role, content, row_session_id))
+            else:
+                context_parts.append(f"{role.upper()}: {content}")
         
-        if include_past_sessions:
-            past_memories = self.get_recent_memories(agent_id, limit=5)
-            if past_memories:
-                context_parts.append("\n=== Relevant Past Context ===")
-                for mem in past_memories[:3]:
-                    if mem.session_id != session_id:
-                        context_parts.append(f"{mem.role.upper()}: {mem.content}")
+        if past_rows:
+            context_parts.append("\n=== Relevant Past Context ===")
+            for role, content, row_session_id in past_rows[:3]:
+                if row_session_id != session_id:
+                    context_parts.append(f"{role.upper()}: {content}")
         
         return "\n".join(context_parts)
     
-    def _generate_id(self, content: str, session_id: str) -> str:
+    def _generate_id(self) -> str:
         """Generate a unique ID for a memory"""
-        unique_str = f"{content}{session_id}{datetime.utcnow().isoformat()}"
-        return hashlib.sha256(unique_str.encode()).hexdigest()[:16]
+        # IDs only need to be unique, so random bits are enough; no hashing required
+        return uuid.uuid4().hex[:16]
     
     def get_statistics(self, agent_id: str) -> Dict:
         """Get memory statistics for an agent"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_memories,
-                COUNT(DISTINCT session_id) as total_sessions,
-                MIN(timestamp) as first_memory,
-                MAX(timestamp) as last_memory
-            FROM memories
-            WHERE agent_id = ?
-        """, (agent_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        self._flush()
+        with self._lock:
+            row = self._conn.execute(SQL_STATS, (agent_id,)).fetchone()
         
         return {
             "total_memories": row[0],
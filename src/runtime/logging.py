@@ -1,9 +1,16 @@
+import atexit
 import logging
+import multiprocessing
 import os
+import queue
 import time
 from dataclasses import dataclass
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
 
+# Background listener that owns the log file handler, if file logging is enabled
+_file_listener: Optional[QueueListener] = None
+
 
 @dataclass
 class LoggingConfig:
@@ -52,10 +59,22 @@ def setup_logging(
         log_level = logging_config.log_level
         log_to_file = logging_config.log_to_file
 
+    global _file_listener
+
     level = getattr(logging, log_level.upper(), logging.INFO)
 
     logging.getLogger().handlers.clear()
 
+    # Provider subprocesses exit via os._exit or terminate(), so atexit never drains
+    # a listener there; they write to their file synchronously instead
+    in_subprocess = multiprocessing.parent_process() is not None
+    if in_subprocess:
+        # A forked child inherits the parent's listener, whose thread and file
+        # belong to the parent; drop it without stopping or closing it
+        _file_listener = None
+    else:
+        _stop_file_listener()
+
     formatter = logging.Formatter(
         fmt="%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
     )
@@ -73,14 +92,46 @@ def setup_logging(
         file_handler = logging.FileHandler(
             f"logs/{config_name}_{time.strftime('%Y-%m-%d_%H-%M-%S')}.log",
             mode="a",
+            delay=True,
         )
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        handlers.append(file_handler)
+
+        if in_subprocess:
+            handlers.append(file_handler)
+        else:
+            # Callers only enqueue records; the listener thread does the disk writes
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            queue_handler = QueueHandler(log_queue)
+            queue_handler.setLevel(level)
+            # Only merge args here; the file handler applies the real formatter
+            queue_handler.setFormatter(logging.Formatter("%(message)s"))
+            handlers.append(queue_handler)
+
+            _file_listener = QueueListener(
+                log_queue, file_handler, respect_handler_level=True
+            )
+            _file_listener.start()
 
     logging.basicConfig(level=level, handlers=handlers)
 
 
+def _stop_file_listener() -> None:
+    """
+    Stop the file logging listener, flushing any queued records to disk.
+    """
+    global _file_listener
+
+    if _file_listener is not None:
+        _file_listener.stop()
+        for handler in _file_listener.handlers:
+            handler.close()
+        _file_listener = None
+
+
+atexit.register(_stop_file_listener)
+
+
 def get_logging_config() -> LoggingConfig:
     """
     Get the current logging configuration.
@@ -92,7 +143,8 @@ def get_logging_config() -> LoggingConfig:
     """
     return LoggingConfig(
         log_level=logging.getLevelName(logging.getLogger().level),
-        log_to_file=any(
+        log_to_file=_file_listener is not None
+        or any(
             isinstance(handler, logging.FileHandler)
             for handler in logging.getLogger().handlers
         ),
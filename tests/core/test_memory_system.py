@@ -0,0 +1,285 @@
+import gc
+import json
+import sqlite3
+import threading
+import time
+import weakref
+from datetime import datetime
+
+import pytest
+
+from core import memory_system
+from core.memory_system import LongTermMemory
+
+
+@pytest.fixture
+def memory(tmp_path):
+    return LongTermMemory(db_path=str(tmp_path / "memory.db"))
+
+
+def test_add_memory(memory):
+    memory_id = memory.add_memory("user", "Hello!", "spot", "session1")
+
+    memories = memory.get_recent_memories("spot", "session1")
+    assert len(memories) == 1
+    assert memories[0].id == memory_id
+    assert memories[0].role == "user"
+    assert memories[0].content == "Hello!"
+
+
+def test_add_memories(memory):
+    ids = memory.add_memories(
+        [
+            ("user", "Hello, robot!", "spot", "session1"),
+            ("assistant", "Hi! How can I help?", "spot", "session1"),
+        ]
+    )
+
+    assert len(ids) == 2
+    assert len(set(ids)) == 2
+    assert memory.get_statistics("spot")["total_memories"] == 2
+
+
+def test_wal_journal_mode(memory):
+    conn = sqlite3.connect(memory.db_path)
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+
+    assert journal_mode == "wal"
+
+
+@pytest.fixture(params=["orjson", "json"])
+def serializer(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(memory_system, "orjson", None)
+    return request.param
+
+
+@pytest.mark.parametrize(
+    "metadata",
+    [
+        {"source": "asr", "confidence": 0.9, "tags": ["greeting"]},
+        {"score": float("nan"), "limit": float("inf")},
+        {"when": datetime(2026, 1, 1).isoformat()},
+        {"big": 2**70, "wide": 2**64},
+    ],
+)
+def test_metadata_round_trip(memory, serializer, metadata):
+    memory.add_memory("user", "Hello!", "spot", "session1", metadata=metadata)
+
+    memories = memory.get_recent_memories("spot", "session1")
+    # Compare serialized forms so NaN matches NaN
+    assert json.dumps(memories[0].metadata) == json.dumps(metadata)
+
+
+def test_metadata_rejects_datetime(memory, serializer):
+    with pytest.raises(TypeError):
+        memory.add_memory(
+            "user",
+            "Hello!",
+            "spot",
+            "session1",
+            metadata={"when": datetime(2026, 1, 1)},
+        )
+
+
+def test_batched_writes_are_buffered(tmp_path):
+    memory = LongTermMemory(db_path=str(tmp_path / "memory.db"), batch_size=3)
+    memory.add_memory("user", "one", "spot", "session1")
+    memory.add_memory("assistant", "two", "spot", "session1")
+
+    conn = sqlite3.connect(memory.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0] == 0
+
+    memory.add_memory("user", "three", "spot", "session1")
+    assert conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0] == 3
+    conn.close()
+
+
+def test_reads_flush_pending_writes(tmp_path):
+    memory = LongTermMemory(db_path=str(tmp_path / "memory.db"), batch_size=10)
+    memory.add_memory("user", "Hello!", "spot", "session1")
+
+    memories = memory.get_recent_memories("spot", "session1")
+    assert [m.content for m in memories] == ["Hello!"]
+
+
+def test_close_flushes_pending_writes(tmp_path):
+    db_path = str(tmp_path / "memory.db")
+    memory = LongTermMemory(db_path=db_path, batch_size=10)
+    memory.add_memory("user", "Hello!", "spot", "session1")
+    memory.close()
+    memory.close()
+
+    reopened = LongTermMemory(db_path=db_path)
+    assert reopened.get_statistics("spot")["total_memories"] == 1
+    reopened.close()
+
+
+def test_identical_content_gets_distinct_ids(memory):
+    ids = memory.add_memories(
+        [
+            ("user", "ok", "spot", "session1"),
+            ("user", "ok", "spot", "session1"),
+        ]
+    )
+
+    assert len(set(ids)) == 2
+    assert all(len(memory_id) == 16 for memory_id in ids)
+
+
+def test_get_context_window(memory):
+    memory.add_memory("user", "What's the weather?", "spot", "session0")
+    memory.add_memory("assistant", "Sunny.", "spot", "session0")
+    memory.add_memory("user", "Hello!", "spot", "session1")
+    memory.add_memory("assistant", "Hi there.", "spot", "session1")
+
+    context = memory.get_context_window("spot", "session1")
+
+    assert context == (
+        "=== Current Conversation ===\n"
+        "USER: Hello!\n"
+        "ASSISTANT: Hi there.\n"
+        "\n=== Relevant Past Context ===\n"
+        "USER: What's the weather?\n"
+        "ASSISTANT: Sunny."
+    )
+
+
+def test_get_context_window_current_session_only(memory):
+    memory.add_memory("user", "What's the weather?", "spot", "session0")
+    memory.add_memory("user", "Hello!", "spot", "session1")
+
+    context = memory.get_context_window("spot", "session1", include_past_sessions=False)
+
+    assert context == "=== Current Conversation ===\nUSER: Hello!"
+
+
+def test_metadata_non_str_keys(memory, serializer):
+    memory.add_memory(
+        "user", "Hello!", "spot", "session1", metadata={"turn": 1, 2: "x"}
+    )
+
+    memories = memory.get_recent_memories("spot", "session1")
+    assert memories[0].metadata == {"turn": 1, "2": "x"}
+
+
+def test_metadata_written_by_json_is_readable(memory, serializer):
+    memory.add_memory("user", "Hello!", "spot", "session1")
+    conn = sqlite3.connect(memory.db_path)
+    conn.execute("UPDATE memories SET metadata = ?", ('{"score": NaN}',))
+    conn.commit()
+    conn.close()
+
+    memories = memory.get_recent_memories("spot", "session1")
+    assert memories[0].metadata["score"] != memories[0].metadata["score"]
+
+
+class SlowReleaseLock:
+    """Lock that stalls right after it is released, widening race windows"""
+
+    def __init__(self, released):
+        self.lock = threading.Lock()
+        self.released = released
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, *args):
+        self.lock.release()
+        self.released.set()
+        time.sleep(0.2)
+
+
+def test_read_waits_for_flush_in_progress(tmp_path):
+    memory = LongTermMemory(db_path=str(tmp_path / "memory.db"), batch_size=10)
+    memory.add_memory("user", "Hello!", "spot", "session1")
+    swapped = threading.Event()
+    memory._pending_lock = SlowReleaseLock(swapped)
+
+    flusher = threading.Thread(target=memory.flush)
+    flusher.start()
+    swapped.wait()
+    memories = memory.get_recent_memories("spot", "session1")
+    flusher.join()
+
+    assert [m.content for m in memories] == ["Hello!"]
+
+
+def test_unclosed_instances_are_collected(tmp_path):
+    memory = LongTermMemory(db_path=str(tmp_path / "memory.db"), batch_size=10)
+    memory.add_memory("user", "Hello!", "spot", "session1")
+    ref = weakref.ref(memory)
+
+    del memory
+    gc.collect()
+
+    assert ref() is None
+    with LongTermMemory(db_path=str(tmp_path / "memory.db")) as reopened:
+        assert reopened.get_statistics("spot")["total_memories"] == 1
+
+
+def test_context_manager_closes(tmp_path):
+    with LongTermMemory(db_path=str(tmp_path / "memory.db"), batch_size=10) as memory:
+        memory.add_memory("user", "Hello!", "spot", "session1")
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        memory._conn.execute("SELECT 1")
+    with LongTermMemory(db_path=str(tmp_path / "memory.db")) as reopened:
+        assert reopened.get_statistics("spot")["total_memories"] == 1
+
+
+@pytest.mark.parametrize("batch_size", [1, 10])
+def test_use_after_close_raises(tmp_path, batch_size):
+    memory = LongTermMemory(db_path=str(tmp_path / "memory.db"), batch_size=batch_size)
+    memory.close()
+
+    with pytest.raises(RuntimeError, match="closed"):
+        memory.add_memory("user", "Hello!", "spot", "session1")
+    with pytest.raises(RuntimeError, match="closed"):
+        memory.add_memories([("user", "Hello!", "spot", "session1")])
+    with pytest.raises(RuntimeError, match="closed"):
+        memory.flush()
+    assert memory._pending == []
+
+
+def test_bad_row_does_not_discard_buffered_rows(tmp_path):
+    memory = LongTermMemory(db_path=str(tmp_path / "memory.db"), batch_size=3)
+    memory.add_memory("user", "good1", "spot", "session1")
+    memory.add_memory("user", "good2", "spot", "session1")
+
+    with pytest.raises(sqlite3.InterfaceError):
+        memory.add_memory("user", object(), "spot", "session1")
+
+    assert memory._pending == []
+    memories = memory.get_recent_memories("spot", "session1")
+    assert [m.content for m in memories] == ["good1", "good2"]
+
+
+def test_bad_row_does_not_fail_later_read(tmp_path):
+    memory = LongTermMemory(db_path=str(tmp_path / "memory.db"), batch_size=10)
+    memory.add_memory("user", "good", "spot", "session1")
+    memory.add_memory("user", object(), "spot", "session1")
+
+    memories = memory.get_recent_memories("spot", "session1")
+    assert [m.content for m in memories] == ["good"]
+
+
+def test_locked_database_keeps_rows_buffered(tmp_path):
+    memory = LongTermMemory(db_path=str(tmp_path / "memory.db"), batch_size=10)
+    memory._conn.execute("PRAGMA busy_timeout=0")
+    memory.add_memory("user", "Hello!", "spot", "session1")
+
+    other = sqlite3.connect(memory.db_path)
+    other.execute("BEGIN IMMEDIATE")
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        memory.flush()
+    assert len(memory._pending) == 1
+
+    other.rollback()
+    other.close()
+    memory.flush()
+    assert memory._pending == []
+    assert memory.get_statistics("spot")["total_memories"] == 1
@@ -0,0 +1,87 @@
+import glob
+import logging
+import multiprocessing
+import os
+
+import pytest
+
+import runtime.logging as runtime_logging
+from runtime.logging import get_logging_config, setup_logging
+
+
+@pytest.fixture(autouse=True)
+def isolated_logging(tmp_path, monkeypatch):
+    """Run each test in its own directory and restore the root logger afterwards."""
+    monkeypatch.chdir(tmp_path)
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    level = root.level
+    yield
+    runtime_logging._stop_file_listener()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def read_log(config_name):
+    paths = glob.glob(f"logs/{config_name}_*.log")
+    assert len(paths) == 1
+    with open(paths[0]) as f:
+        return f.read()
+
+
+def log_from_child():
+    setup_logging("child", log_to_file=True)
+    logging.info("from child")
+    # Provider processes end without running atexit hooks
+    os._exit(0)
+
+
+def test_setup_logging_with_file_starts_listener():
+    setup_logging("test", log_to_file=True)
+
+    assert runtime_logging._file_listener is not None
+    assert runtime_logging._file_listener._thread is not None
+
+
+def test_records_reach_log_file():
+    setup_logging("test", log_to_file=True)
+    logging.info("hello %s", "robot")
+    runtime_logging._stop_file_listener()
+
+    assert "INFO - hello robot" in read_log("test")
+
+
+def test_setup_logging_again_stops_previous_listener():
+    setup_logging("first", log_to_file=True)
+    first_listener = runtime_logging._file_listener
+    logging.info("before reconfigure")
+
+    setup_logging("second", log_to_file=False)
+
+    assert first_listener is not None
+    assert first_listener._thread is None
+    assert runtime_logging._file_listener is None
+    assert "before reconfigure" in read_log("first")
+
+
+def test_get_logging_config_reports_file_logging():
+    setup_logging("test", log_level="DEBUG", log_to_file=True)
+    config = get_logging_config()
+    assert config.log_to_file is True
+    assert config.log_level == "DEBUG"
+
+    setup_logging("test", log_to_file=False)
+    assert get_logging_config().log_to_file is False
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_subprocess_writes_log_file_synchronously():
+    # The child inherits the parent's listener through fork
+    setup_logging("parent", log_to_file=True)
+
+    process = multiprocessing.get_context("fork").Process(target=log_from_child)
+    process.start()
+    process.join()
+
+    assert process.exitcode == 0
+    assert "INFO - from child" in read_log("child")